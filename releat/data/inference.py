@@ -314,9 +314,8 @@ def make_feature_obs(config, feature_data):
                 # error is expected to be pip times larger than 1e-7
                 feats = feats[:, 0]
                 feats = feats - feats[-1]
-                symbol = fc.symbol
-                symbol_index = config.symbol_info_index[symbol]
-                pip = config.symbol_info[symbol_index].pip
+                # python float keeps the float32 feats in float32
+                pip = float(config.pip_by_symbol[config.symbol_info_index[fc.symbol]])
                 feats = feats[:-1] / pip
                 feats = feats.reshape((-1, 1))
                 for tc in fc.transforms:
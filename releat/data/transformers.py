@@ -286,6 +286,117 @@ def apply_transform(arr, tc):
     return func(arr, tc)
 
 
+# op codes of the transforms that can be fused by make_fused_transform
+FUSED_CLIP = 0
+FUSED_YEO_JOHNSON = 1
+FUSED_PIECEWISE_LINEAR = 2
+
+# tolerance used to compare lambda in the yeo-johnson transform
+yeo_johnson_eps = np.float32(np.spacing(1.0))
+
+
+def make_fused_transform(fc):
+    """Make fused transform.
+
+    Stacks the parameters of all the transforms of a feature, so that they can be
+    applied in one pass over the array by apply_fused_transform rather than
+    one pass per transform.
+
+    Args:
+        fc (SimpleFeatureConfig)
+            feature config with enriched transforms
+
+    Returns:
+        tuple(np.array) | None
+            op code of each transform and their parameters (number of transforms x 3 x
+            output_shape), or None if one of the transforms can not be fused
+
+    """
+    ops = np.empty(len(fc.transforms), dtype=np.int64)
+    params = np.zeros((len(fc.transforms), 3, *fc.output_shape), dtype=np.float32)
+    for t_ind, tc in enumerate(fc.transforms):
+        match (tc.name, tc.method):
+            case ("clip", _):
+                ops[t_ind] = FUSED_CLIP
+                vals = (tc.clip_min, tc.clip_max, tc.scale_factor)
+            case ("scale", "PowerTransformer"):
+                ops[t_ind] = FUSED_YEO_JOHNSON
+                vals = (tc.lam, tc.mean, tc.std)
+            case ("scale", "PiecewiseLinear"):
+                ops[t_ind] = FUSED_PIECEWISE_LINEAR
+                vals = ()
+            case _:
+                return None
+        # parameters are not enriched or do not match the output shape
+        if any(val is None for val in vals):
+            return None
+        try:
+            for p_ind, val in enumerate(vals):
+                params[t_ind, p_ind] = val
+        except ValueError:
+            return None
+    return ops, params
+
+
+@njit(cache=True)
+def apply_fused_transform(arr, ops, params):
+    """Apply fused transform.
+
+    Same result as apply_transform for each transform in turn, i.e. clip_by_value,
+    yeo_johnson_transform and linear_scaling, computed element by element in one pass.
+
+    Args:
+        arr (np.array)
+            2d array of the same shape as the parameters, modified in place
+        ops (np.array)
+            op code of each transform, see make_fused_transform
+        params (np.array)
+            parameters of each transform, see make_fused_transform
+
+    Returns:
+        np.array
+            transformed array
+
+    """
+    for i in range(arr.shape[0]):
+        for j in range(arr.shape[1]):
+            x = arr[i, j]
+            for t in range(len(ops)):
+                a = params[t, 0, i, j]
+                b = params[t, 1, i, j]
+                c = params[t, 2, i, j]
+                if ops[t] == FUSED_CLIP:
+                    if x < a:
+                        x = a
+                    if x > b:
+                        x = b
+                    x = x * c
+                elif ops[t] == FUSED_YEO_JOHNSON:
+                    if x >= 0:
+                        if abs(a) < yeo_johnson_eps:
+                            x = np.log1p(x)
+                        else:
+                            x = ((x + 1) ** a - 1) / a
+                    elif abs(a - 2) > yeo_johnson_eps:
+                        x = -((-x + 1) ** (2 - a) - 1) / (2 - a)
+                    else:
+                        x = -np.log1p(-x)
+                    x = (x - b) / c
+                else:
+                    lim1 = 2
+                    lim2 = 3
+                    if x > lim1:
+                        x = lim1 + (x - lim1) / 2
+                    if x > lim2:
+                        x = lim2 + (x - lim2) / 2
+                    if x < -lim1:
+                        x = -lim1 + (x + lim1) / 2
+                    if x < -lim2:
+                        x = -lim2 + (x + lim2) / 2
+            arr[i, j] = x
+    return arr
+
+
 def get_one_transform_param(config, feat_group_ind, feat_ind, t_ind, feats):
     """Get one transform param.
 
@@ -8,6 +8,7 @@ import aerospike
 import gymnasium as gym
 import numpy as np
 import pandas as pd
+import ray
 
 from releat.data.inference import get_obs_interval
 from releat.data.simple.stats import randint
@@ -19,9 +20,11 @@ from releat.gym_env.mask import assess_must_actions
 from releat.gym_env.mask import make_mask
 from releat.gym_env.metrics import TradingMetrics
 from releat.gym_env.obs_processor import get_curr_price
+from releat.gym_env.obs_processor import get_curr_price_batch
 from releat.gym_env.obs_processor import get_obs
 from releat.gym_env.obs_processor import init_raw_data
-from releat.gym_env.obs_processor import portfolio_to_model_input
+from releat.gym_env.obs_processor import make_raw_data
+from releat.gym_env.obs_processor import portfolio_to_model_input_into
 from releat.gym_env.obs_processor import update_raw_data
 
 
@@ -33,6 +36,8 @@ class FxEnv(gym.Env):
 
         Args:
             env_config (dict)
+                agent config, or a config_ref to an agent config in the ray object
+                store that is shared by all the rollout workers
 
         Returns:
             None
@@ -40,6 +45,9 @@ class FxEnv(gym.Env):
         """
         super().__init__()
 
+        if "config_ref" in config:
+            config = ray.get(config["config_ref"])
+
         self.config = deepcopy(config)
         # unpack env_config variables
         for k, v in config.items():
@@ -57,6 +65,8 @@ class FxEnv(gym.Env):
         self.action_map = build_action_map(self.trader)
         # initialise empty array for portfolio
         self.portfolio = build_pos_arrs(self.trader)
+        # buffer for the model input of the portfolio, reused at every step
+        self._pos_val_buf = np.empty(len(self.portfolio) * 2, dtype=np.float32)
 
         for k, v in self.gym_env.dict().items():
             setattr(self, k, v)
@@ -77,7 +87,9 @@ class FxEnv(gym.Env):
 
         raw_data_shape = {}
         obs_interval = {}
+        feat_group_cols = {}
         lens = []
+        col = 0
         trade_timeframe = self.raw_data.trade_timeframe
         for i in range(len(self.features)):
             feat_group = self.features[i]
@@ -88,9 +100,26 @@ class FxEnv(gym.Env):
             obs_interval[str(i)] = interval
             raw_data_shape[str(i)] = val
             lens.append(val)
+            # feature groups are stored side by side in one raw data buffer
+            width = sum(fc.output_shape[1] for fc in feat_group.simple_features)
+            feat_group_cols[str(i)] = slice(col, col + width)
+            col += width
         raw_data_shape["max"] = max(lens)
         self.raw_data_shape = raw_data_shape
         self.obs_interval = obs_interval
+        self.feat_group_cols = feat_group_cols
+        # record indexes of each feature group observation in the raw data buffer,
+        # each feature group uses the latest raw_data_shape[k] records
+        self.obs_idx = tuple(
+            np.arange(
+                raw_data_shape["max"] - raw_data_shape[k],
+                raw_data_shape["max"],
+                obs_interval[k],
+                dtype=np.intp,
+            )
+            for k in feat_group_cols
+        )
+        self.data = make_raw_data(feat_group_cols, raw_data_shape)
 
     def initialize(self):
         """Initialize env.
@@ -185,16 +214,22 @@ class FxEnv(gym.Env):
         self.trading_metrics.reset_metrics(self.start_ind)
 
         self.data = init_raw_data(
-            self.config,
             self.client,
-            self.raw_data_shape,
+            self.hot_config,
+            self.feat_group_cols,
+            self.data,
             self.data_ind,
         )
 
-        obs = get_obs(self.config, self.obs_interval, deepcopy(self.data))
+        obs = get_obs(
+            self.hot_config,
+            self.obs_idx,
+            self.feat_group_cols,
+            self.data,
+        )
 
-        price = self.data["trade_price"]
-        self.curr_price = get_curr_price(self.symbol_info, price)
+        price = np.asarray(self.data["trade_price"], dtype=np.float64)
+        self.curr_price = get_curr_price(price, self.pip_by_symbol)
 
         self.time_int = self.data["date"]
         obs["mask"] = make_mask(
@@ -211,17 +246,20 @@ class FxEnv(gym.Env):
 
     def _next_observation(self):
         """Next observation."""
-        for i in range(self.skip_step):
-            self.data = update_raw_data(
-                self.config,
-                self.client,
-                self.raw_data_shape,
-                self.data,
-                self.data_ind,
-            )
+        # read all the skipped records at once and sample their prices in one call
+        self.data = update_raw_data(
+            self.client,
+            self.hot_config,
+            self.feat_group_cols,
+            self.data,
+            self.data_ind,
+            self.skip_step,
+        )
+        curr_prices = get_curr_price_batch(self.data["trade_prices"], self.pip_by_symbol)
 
-            pos_val = portfolio_to_model_input(self.portfolio).tolist()
-            self.raw_pos_vals.append(pos_val)
+        for i in range(self.skip_step):
+            portfolio_to_model_input_into(self.portfolio, self._pos_val_buf)
+            self.raw_pos_vals.append(self._pos_val_buf.tolist())
 
             if i < self.skip_step - 1:
                 self.portfolio, _, _ = exec_action(
@@ -233,14 +271,16 @@ class FxEnv(gym.Env):
                     self.commission,
                 )
 
-            price = self.data["trade_price"]
-            self.curr_price = get_curr_price(self.symbol_info, price)
-
-            self.time_int = self.data["date"]
-            self.data_ind += 1
+            self.curr_price = curr_prices[i]
+            self.time_int = self.data["dates"][i]
 
-        obs = get_obs(self.config, self.obs_interval, deepcopy(self.data))
-        self.data_ind -= 1
+        self.data_ind += self.skip_step - 1
+        obs = get_obs(
+            self.hot_config,
+            self.obs_idx,
+            self.feat_group_cols,
+            self.data,
+        )
         self.raw_pos_vals = self.raw_pos_vals[-20:]
 
         must_hold, must_close = assess_must_actions(
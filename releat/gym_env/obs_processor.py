@@ -4,12 +4,102 @@ from __future__ import annotations
 import numpy as np
 from numba import njit
 
-from releat.data.simple.stats import apply_log_tail
 from releat.data.simple.stats import randint
+from releat.data.transformers import apply_fused_transform
 from releat.data.transformers import apply_transform
 
 
-def init_raw_data(config, client, raw_data_shape, i):
+class RingBuffer:
+    """Ring buffer.
+
+    Fixed size window of the most recent records. A new record overwrites the oldest
+    record in place, so stepping the environment does not reallocate the whole window.
+
+    """
+
+    def __init__(self, buf):
+        """Init.
+
+        Args:
+            buf (np.array):
+                preallocated array, rows are records ordered from oldest to newest
+
+        Returns:
+            None
+
+        """
+        self.buf = buf
+        # index of the oldest record, i.e. where the next record is written
+        self.head = 0
+
+    def __len__(self):
+        """Number of records in the window."""
+        return len(self.buf)
+
+    def push_fields(self, record, cols_by_field):
+        """Push fields.
+
+        Writes each field of the record straight into its columns of the oldest row,
+        rather than concatenating the fields into a temporary row first.
+
+        Args:
+            record (dict):
+                newest record, overwrites the oldest record
+            cols_by_field (dict(slice)):
+                columns of each field of the record
+
+        Returns:
+            None
+
+        """
+        row = self.buf[self.head]
+        for k, cols in cols_by_field.items():
+            row[cols] = record[k]
+        self.head = (self.head + 1) % len(self.buf)
+
+    def take(self, idx, cols=slice(None)):
+        """Take.
+
+        Args:
+            idx (np.array):
+                record indexes where 0 is the oldest record
+            cols (slice):
+                columns of the records to take
+
+        Returns:
+            np.array
+                copy of the selected records
+
+        """
+        # gather only the selected columns, wrapping the shifted indexes rather than
+        # taking their modulo, idx + head is still a new array on each call
+        return self.buf[:, cols].take(idx + self.head, axis=0, mode="wrap")
+
+
+def make_raw_data(feat_group_cols, raw_data_shape):
+    """Make raw data.
+
+    Preallocates the raw data buffer once per gym environment, it is then refilled
+    in place at each reset.
+
+    Args:
+        feat_group_cols (dict(slice)):
+            columns of each feature group in the raw data buffer
+        raw_data_shape (dict):
+            shape for each of the arrays in the observation
+
+    Returns:
+        dict
+            raw_data with all feature groups stored side by side in one RingBuffer of
+            raw_data_shape["max"] records
+
+    """
+    width = max(cols.stop for cols in feat_group_cols.values())
+    buf = np.empty((raw_data_shape["max"], width), dtype=np.float32)
+    return {"buf": RingBuffer(buf)}
+
+
+def init_raw_data(client, hot_config, feat_group_cols, raw_data, i):
     """Initialise raw data.
 
     Initialising raw data by reading and storing in memory the all the records
@@ -21,12 +111,14 @@ def init_raw_data(config, client, raw_data_shape, i):
     Run at gym environment reset
 
     Args:
-        config (Dict(pydantic.BaseModel|dict|Any)):
-            as defined in 'agent_config.py'
         client (aerospike.Client):
             client object for downloading downloading records
-        raw_data_shape (dict):
-            shape for each of the arrays in the observation
+        hot_config (HotConfig):
+            config values read at every step
+        feat_group_cols (dict(slice)):
+            columns of each feature group in the raw data buffer
+        raw_data (dict):
+            raw data from make_raw_data, overwritten in place
         i (int):
             database table index of the starting observation, i.e. records are pulled
             from i-x:i
@@ -36,67 +128,63 @@ def init_raw_data(config, client, raw_data_shape, i):
             raw_data from which the observation can be build
 
     """
-    raw_data = {}
-    feat_group_inds = [x for x in raw_data_shape.keys() if x != "max"]
-    for k in feat_group_inds:
-        raw_data[k] = []
-
-    for j in range(i - raw_data_shape["max"], i + 1):
-        key = (
-            config["aerospike"].namespace,
-            config["aerospike"].set_name,
-            j,
-        )
-        (_, _, bins) = client.get(key)
-        for k in feat_group_inds:
-            raw_data[k].append(bins[k])
+    buf = raw_data["buf"]
+    namespace = hot_config.namespace
+    set_name = hot_config.set_name
+    keys = [(namespace, set_name, j) for j in range(i - len(buf) + 1, i + 1)]
+    # one batch request rather than a round trip per record
+    records = client.get_many(keys)
+
+    # pushing a full window of records overwrites every row in order
+    for _, _, bins in records:
+        buf.push_fields(bins, feat_group_cols)
 
     raw_data["date"] = bins["date"]
     raw_data["trade_price"] = bins["trade_price"]
     raw_data["date_arr"] = bins["date_arr"]
 
-    for k in feat_group_inds:
-        raw_data[k] = np.array(raw_data[k][-raw_data_shape[k] :], dtype=np.float32)
-
     return raw_data
 
 
-def update_raw_data(config, client, raw_data_shape, raw_data, i):
+def update_raw_data(client, hot_config, feat_group_cols, raw_data, i, n=1):
     """Update raw data.
 
-    Reads the next record and appends to raw data. Run at each gym environment step.
+    Reads the next n records and overwrites the oldest records of raw data. Run at each
+    gym environment step, so the arguments are unpacked from the config once rather
+    than on every call.
 
     Args:
-        config (Dict(pydantic.BaseModel|dict|Any)):
-            as defined in 'agent_config.py'
         client (aerospike.Client):
             client object for downloading downloading records
-        raw_data_shape (dict):
-            shape for each of the arrays in the observation
+        hot_config (HotConfig):
+            config values read at every step
+        feat_group_cols (dict(slice)):
+            columns of each feature group in the raw data buffer
         raw_data (dict):
-            raw data where the new record will be appended
+            raw data where the new record will be pushed
         i (int):
             database table index of the next observation
+        n (int):
+            number of records to read, i.e. the gym skip_step
 
     Returns:
         dict
-            raw_data with the next observation appended
+            raw_data with the next n observations appended, as well as the trade
+            prices and dates of each of them in trade_prices and dates
 
     """
-    feat_group_inds = [x for x in raw_data_shape.keys() if x != "max"]
-
-    key = (
-        config["aerospike"].namespace,
-        config["aerospike"].set_name,
-        i,
-    )
+    namespace = hot_config.namespace
+    set_name = hot_config.set_name
+    records = client.get_many([(namespace, set_name, j) for j in range(i, i + n)])
 
-    (_, _, bins) = client.get(key)
-
-    for k in feat_group_inds:
-        bins[k] = np.array([bins[k]], dtype=np.float32)
-        raw_data[k] = np.vstack([raw_data[k], bins[k]])[1:]
+    for _, _, bins in records:
+        raw_data["buf"].push_fields(bins, feat_group_cols)
 
+    raw_data["trade_prices"] = np.array(
+        [bins["trade_price"] for _, _, bins in records],
+        dtype=np.float64,
+    )
+    raw_data["dates"] = [bins["date"] for _, _, bins in records]
     raw_data["date"] = bins["date"]
     raw_data["trade_price"] = bins["trade_price"]
     raw_data["date_arr"] = bins["date_arr"]
@@ -104,7 +192,7 @@ def update_raw_data(config, client, raw_data_shape, raw_data, i):
     return raw_data
 
 
-def get_obs(config, obs_interval, raw_data):
+def get_obs(hot_config, obs_idx, feat_group_cols, raw_data):
     """Get obs.
 
     # TODO make this parametric for feats + pips + multi symbol
@@ -113,12 +201,15 @@ def get_obs(config, obs_interval, raw_data):
     on the feature timeframe
 
     Args:
-        config (Dict(pydantic.BaseModel|dict|Any)):
-            as defined in 'agent_config.py'
-        obs_interval (dict):
-            the timeframe of each feature group
+        hot_config (HotConfig):
+            config values read at every step
+        obs_idx (tuple(np.array)):
+            record indexes in the raw data buffer of each feature group, i.e. every
+            X records depending on the feature timeframe
+        feat_group_cols (dict(slice)):
+            columns of each feature group in the raw data buffer
         raw_data (dict):
-            raw data
+            raw data, not modified as the strided records are copied
 
     Returns:
         dict
@@ -126,37 +217,34 @@ def get_obs(config, obs_interval, raw_data):
 
     """
     obs = {}
-    feat_group_inds = [x for x in obs_interval.keys()]
-    for k in feat_group_inds:
-        obs[k] = raw_data[k][:: obs_interval[k]]
-
-    for feat_group_ind in range(len(feat_group_inds)):
-        feat_ind = 0
-        feat_group = config["features"][feat_group_ind]
-        fc = feat_group.simple_features[feat_ind]
-        feats = obs[str(feat_group_ind)][:, 0]
-        feats = feats - feats[-1]
-
-        symbol = fc.symbol
-        symbol_index = config["symbol_info_index"][symbol]
-        pip = config["symbol_info"][symbol_index].pip
-
-        feats = feats[:-1] / pip
-        feats = feats.reshape((-1, 1))
-        for tc in fc.transforms:
-            feats = apply_transform(feats, tc)
-
-        obs[str(feat_group_ind)] = obs[str(feat_group_ind)][1:]
-        obs[str(feat_group_ind)][:, 0] = feats[:, 0]
-        obs[str(feat_group_ind)] = obs[str(feat_group_ind)].astype("float32")
+    buf = raw_data["buf"]
+    pip_by_feat_group = hot_config.pip_by_feat_group
+    fused_transforms = hot_config.fused_transforms_by_feat_group
+    for feat_group_ind, transforms in enumerate(hot_config.transforms_by_feat_group):
+        k = str(feat_group_ind)
+        # strided copy of the float32 window, modified in place below
+        feat_group_obs = buf.take(obs_idx[feat_group_ind], feat_group_cols[k])
+
+        # difference to the latest value, in pips
+        feats = feat_group_obs[:-1, :1] - feat_group_obs[-1, 0]
+        feats /= pip_by_feat_group[feat_group_ind]
+        if fused_transforms[feat_group_ind] is not None:
+            feats = apply_fused_transform(feats, *fused_transforms[feat_group_ind])
+        else:
+            for tc in transforms:
+                feats = apply_transform(feats, tc)
+
+        feat_group_obs = feat_group_obs[1:]
+        feat_group_obs[:, 0] = feats[:, 0]
+        obs[k] = feat_group_obs
 
     obs["date_arr"] = np.array(raw_data["date_arr"], dtype="float32")
     return obs
 
 
-@njit("float32[:](float32[:])", nogil=True, cache=True, fastmath=True)
-def scale_pos_val(pos_val):
-    """Scale pos val.
+@njit("float32(float32)", nogil=True, cache=True, fastmath=True)
+def _scale_one_pos_val(pos_val):
+    """Scale one pos val.
 
     Args:
         pos_val (float)
@@ -167,12 +255,15 @@ def scale_pos_val(pos_val):
             scaled position
 
     """
-    thresh = 0
-    log_base = -1
-    scalar = pos_val * np.float32(0.03)
-    pos_val = apply_log_tail(pos_val, thresh, log_base)
-    pos_val = pos_val / np.float32(3.0) + scalar
-    return np.clip(pos_val, np.float32(-2.0), np.float32(2.0))
+    # two-sided log tail with thresh=0 and natural log, see apply_log_tail
+    if pos_val > 0:
+        tail = np.log(pos_val + np.float32(1.0))
+    elif pos_val < 0:
+        tail = -np.log(-pos_val + np.float32(1.0))
+    else:
+        tail = np.float32(0.0)
+    pos_val = tail / np.float32(3.0) + pos_val * np.float32(0.03)
+    return min(max(pos_val, np.float32(-2.0)), np.float32(2.0))
 
 
 @njit(nogil=True, cache=True, fastmath=True)
@@ -195,43 +286,98 @@ def sample_price(min_p, max_p, pip):
     return randint(int(min_p * 10 / pip), int(max_p * 10 / pip) + 1) * pip / 10
 
 
-@njit(nogil=True, cache=True, fastmath=True)
-def portfolio_to_model_input(portfolio):
-    """Portfolio to model input.
+@njit("void(float64[:, :], float32[:])", nogil=True, cache=True, fastmath=True)
+def portfolio_to_model_input_into(portfolio, out):
+    """Portfolio to model input into.
 
     #TODO make this parametric / different ways of representing position value
 
+    Computes for each position the signed position size and the position value
+    scaled by _scale_one_pos_val, in one pass over the portfolio. Writes into a buffer
+    owned by the caller so that the gym step does not allocate.
+
     Args:
         portfolio (np.array)
+        out (np.array)
+            preallocated array of 2 x number of positions, where the flattened
+            [pos_size x pos_dir / 2, scaled pos_val] of each position are written
 
     Returns:
-        np.array
+        None
 
     """
-    # v = portfolio[:, [5, 6, 9, 12]].copy()
-    # v[:, 3] = scale_pos_val(v[:, 3].astype("float32"))
-    # v[:, 2] = np.clip(v[:, 2], 0, 720)
-    # v = np.divide(v, np.array([2.0, 1.0, 360, 1.0]))
-    # v = v.flatten()
-    # index 5, 12
-    v = portfolio[:, 5::7].copy()
-    v[:, 1] = scale_pos_val(v[:, 1].astype("float32"))
-    v[:, 0] = v[:, 0] * portfolio[:, 6] / np.float32(2.0)
-    v = v.flatten()
+    for i in range(portfolio.shape[0]):
+        out[2 * i] = portfolio[i, 5] * portfolio[i, 6] / 2.0
+        out[2 * i + 1] = _scale_one_pos_val(np.float32(portfolio[i, 12]))
 
-    return v
 
+@njit("float32[:](float64[:, :])", nogil=True, cache=True, fastmath=True)
+def portfolio_to_model_input(portfolio):
+    """Portfolio to model input.
+
+    Args:
+        portfolio (np.array)
 
-def get_curr_price(symbol_info, price):
+    Returns:
+        np.array
+            flattened [pos_size x pos_dir / 2, scaled pos_val] for each position
+
+    """
+    out = np.empty(portfolio.shape[0] * 2, dtype=np.float32)
+    portfolio_to_model_input_into(portfolio, out)
+    return out
+
+
+@njit("float32[:, :](float64[:], float64[:])", nogil=True, cache=True, fastmath=True)
+def get_curr_price(price, pip_by_symbol):
     """Get curr price.
 
     number of symbols x [bid,ask]
 
+    Args:
+        price (np.array)
+            min bid, max bid, min ask and max ask of each symbol within the action
+            window, flattened
+        pip_by_symbol (np.array)
+            value of a pip of each symbol
+
+    Returns:
+        np.array
+            randomly sampled bid and ask price of each symbol
+
     """
-    curr_price = np.zeros((len(symbol_info), 2), dtype="float32")
-    for i in range(len(symbol_info)):
-        pip = symbol_info[0].pip
+    curr_price = np.empty((len(pip_by_symbol), 2), dtype=np.float32)
+    for i in range(len(pip_by_symbol)):
+        pip = pip_by_symbol[i]
         curr_price[i, 0] = sample_price(price[i * 4], price[i * 4 + 1], pip)
         curr_price[i, 1] = sample_price(price[i * 4 + 2], price[i * 4 + 3], pip)
 
     return curr_price
+
+
+@njit(
+    "float32[:, :, :](float64[:, :], float64[:])", nogil=True, cache=True, fastmath=True
+)
+def get_curr_price_batch(prices, pip_by_symbol):
+    """Get curr price batch.
+
+    get_curr_price for a batch of records, i.e. all the records read in one gym step,
+    in one call. The batch is only skip_step records, which is too small to be worth
+    running in parallel.
+
+    Args:
+        prices (np.array)
+            batch size x flattened min bid, max bid, min ask and max ask of each symbol
+        pip_by_symbol (np.array)
+            value of a pip of each symbol
+
+    Returns:
+        np.array
+            batch size x number of symbols x [bid,ask]
+
+    """
+    curr_prices = np.empty((prices.shape[0], len(pip_by_symbol), 2), dtype=np.float32)
+    for k in range(prices.shape[0]):
+        curr_prices[k] = get_curr_price(prices[k], pip_by_symbol)
+
+    return curr_prices
@@ -7,13 +7,17 @@ from __future__ import annotations
 
 import importlib
 import os
+import pickle
 import sys
+from functools import lru_cache
 from functools import partial
+from glob import glob
 
 import numpy as np
 from gymnasium import spaces
 
 from releat.data.transformers import enrich_all_feature_configs
+from releat.data.transformers import make_fused_transform
 from releat.gym_env.action_processor import build_action_map
 from releat.utils.configs.constants import root_dir
 from releat.utils.configs.constants import trading_instruments
@@ -21,6 +25,7 @@ from releat.utils.configs.data_models import AerospikeConfig
 from releat.utils.configs.data_models import AgentConfig
 from releat.utils.configs.data_models import FeatureGroupConfig
 from releat.utils.configs.data_models import GymEnvConfig
+from releat.utils.configs.data_models import HotConfig
 from releat.utils.configs.data_models import MT5Config
 from releat.utils.configs.data_models import Paths
 from releat.utils.configs.data_models import PositionConfig
@@ -30,6 +35,9 @@ from releat.utils.configs.data_models import SimpleFeatureConfig
 from releat.utils.configs.data_models import SymbolSpec
 from releat.utils.configs.data_models import TraderConfig
 from releat.utils.configs.data_models import TransformerConfig
+from releat.utils.logging import get_logger
+
+logger = get_logger(__name__)
 
 
 def make_box_space(min_obs_val, max_obs_val, shape):
@@ -153,6 +161,32 @@ def get_ticker_info(feature_spec):
     }
 
 
+def make_hot_config(config):
+    """Make hot config.
+
+    Args:
+        config (pydantic.BaseModel):
+            agent config
+
+    Returns:
+        HotConfig:
+            config values that are read by the gym environment at every step
+    """
+    return HotConfig(
+        namespace=config.aerospike.namespace,
+        set_name=config.aerospike.set_name,
+        pip_by_feat_group=config.pip_by_feat_group,
+        transforms_by_feat_group=tuple(
+            fg.simple_features[0].transforms for fg in config.features
+        ),
+        # built here from the enriched transforms that get_obs applies, rather than
+        # stored on each feature whose transforms are re-enriched later
+        fused_transforms_by_feat_group=tuple(
+            make_fused_transform(fg.simple_features[0]) for fg in config.features
+        ),
+    )
+
+
 def make_agent_config(config, feature_spec):
     """Make agent config.
 
@@ -174,26 +208,50 @@ def make_agent_config(config, feature_spec):
     config["mt5"] = MT5Config(**config["mt5"])
 
     config = {**config, **get_ticker_info(feature_spec)}
+    config["pip_by_symbol"] = np.array(
+        [x.pip for x in config["symbol_info"]],
+        dtype=np.float64,
+    )
 
     config["raw_data"] = RawDataConfig(**config["raw_data"])
 
-    for i in range(len(feature_spec)):
-        feat_group = feature_spec[i]
-        feature_spec[i]["index"] = i
-        timeframe = feat_group["timeframe"]
-        for j in range(len(feat_group["simple_features"])):
-            transforms = feature_spec[i]["simple_features"][j]["transforms"]
-            transforms = [TransformerConfig(**x) for x in transforms]
-            feature_spec[i]["simple_features"][j]["transforms"] = transforms
-            feature_spec[i]["simple_features"][j]["timeframe"] = timeframe
-            feature_spec[i]["simple_features"][j]["index"] = j
-            feature_spec[i]["simple_features"][j] = SimpleFeatureConfig(
-                **feature_spec[i]["simple_features"][j],
-            )
-        feature_spec[i] = FeatureGroupConfig(**feature_spec[i])
+    # build new dicts rather than mutating the lists exec'd from feature_config.py
+    feature_spec = [
+        FeatureGroupConfig(
+            **{
+                **fg,
+                "index": i,
+                "simple_features": [
+                    SimpleFeatureConfig(
+                        **{
+                            **sf,
+                            "transforms": [
+                                TransformerConfig(**x) for x in sf["transforms"]
+                            ],
+                            "timeframe": fg["timeframe"],
+                            "index": j,
+                        },
+                    )
+                    for j, sf in enumerate(fg["simple_features"])
+                ],
+            },
+        )
+        for i, fg in enumerate(feature_spec)
+    ]
 
     config["features"] = feature_spec
 
+    # pips used to scale the differencing feature of each feature group in the gym
+    config["pip_by_feat_group"] = np.array(
+        [
+            config["symbol_info"][
+                config["symbol_info_index"][fg.simple_features[0].symbol]
+            ].pip
+            for fg in feature_spec
+        ],
+        dtype=np.float32,
+    )
+
     config["gym_env"] = GymEnvConfig(**config["gym_env"])
 
     # Trader Config
@@ -203,13 +261,19 @@ def make_agent_config(config, feature_spec):
     for i, val in enumerate(config["symbol_info"]):
         symbol_index_map[val.symbol] = [i, val.pip]
 
-    for i in range(len(trader_config["portfolio"])):
-        tc = trader_config["portfolio"][i]
-        trader_config["portfolio"][i]["symbol_index"] = symbol_index_map[tc["symbol"]][0]
-        trader_config["portfolio"][i]["pip_val"] = symbol_index_map[tc["symbol"]][1]
-        trader_config["portfolio"][i] = PositionConfig(
-            **trader_config["portfolio"][i],
-        )
+    trader_config = {
+        **trader_config,
+        "portfolio": [
+            PositionConfig(
+                **{
+                    **tc,
+                    "symbol_index": symbol_index_map[tc["symbol"]][0],
+                    "pip_val": symbol_index_map[tc["symbol"]][1],
+                },
+            )
+            for tc in trader_config["portfolio"]
+        ],
+    }
     config["trader"] = TraderConfig(**trader_config)
 
     # Make observation space
@@ -252,19 +316,48 @@ def make_agent_config(config, feature_spec):
     }
 
     config = AgentConfig(**config)
+    config.hot_config = make_hot_config(config)
 
     return config
 
 
-def load_config(
-    agent_version,
-    enrich_feat_spec=False,
-    is_training=True,
-    load_model=False,
-):
-    """Load configs.
+def get_config_sources(agent_version, enrich_feat_spec):
+    """Get config sources.
 
-    Loads the config depending on whether the config is used for training or inference
+    Args:
+        agent_version (str):
+            agent version
+        enrich_feat_spec (bool):
+            if True then include the pre-calculated transform files
+
+    Returns:
+        list:
+            files that the config is built from
+    """
+    files = [
+        f"{root_dir}/agents/{agent_version}/{name}.py"
+        for name in ["agent_config", "feature_config"]
+    ]
+    files += glob(f"{root_dir}/releat/utils/configs/*.py")
+    # modules outside of configs whose output is stored in the config, i.e. the action
+    # map sizes the action and observation spaces, and the enriched transforms
+    files += [
+        f"{root_dir}/releat/{name}.py"
+        for name in ["gym_env/action_processor", "data/transformers", "data/utils"]
+    ]
+    if enrich_feat_spec:
+        files += glob(f"{root_dir}/data/agent/{agent_version}/features/*/*/transforms/*")
+    return files
+
+
+@lru_cache(maxsize=8)
+def build_config(agent_version, enrich_feat_spec, is_training):
+    """Build config.
+
+    Executes the agent config files and builds the config. The result is pickled
+    and reused by later processes, i.e. ray workers, until one of the files it was
+    built from is modified. It is also cached in memory, so callers should copy it
+    before modifying it.
 
     Args:
         agent_version (str):
@@ -279,6 +372,28 @@ def load_config(
             class object with all configs required by agent
 
     """
+    cache_f = (
+        f"{root_dir}/data/agent/{agent_version}/config"
+        f"/config_{int(is_training)}_{int(enrich_feat_spec)}.pkl"
+    )
+    if os.path.exists(cache_f):
+        cache_t = os.path.getmtime(cache_f)
+        sources = get_config_sources(agent_version, enrich_feat_spec)
+        if all(os.path.getmtime(f) < cache_t for f in sources):
+            try:
+                with open(cache_f, "rb") as fobj:
+                    config = pickle.load(fobj)
+            except Exception as e:
+                logger.warning(f"rebuilding config, failed to load {cache_f}: {e!r}")
+            else:
+                # paths are absolute, so the cache is stale if the repo has moved
+                if config.paths.root_dir == root_dir:
+                    # create folders, as make_save_paths does
+                    for _, path in config.paths.dict().items():
+                        _ = os.makedirs(path, exist_ok=True)
+                    return config
+                logger.warning(f"rebuilding config, {cache_f} has another root_dir")
+
     file_path = f"{root_dir}/agents/{agent_version}"
     sys.path.insert(0, file_path)
     configs = []
@@ -317,6 +432,49 @@ def load_config(
 
     if enrich_feat_spec:
         config = enrich_all_feature_configs(config)
+        # enriching replaces the feature configs
+        config.hot_config = make_hot_config(config)
+
+    # write to a temporary file first so other processes never read a partial file
+    tmp_f = f"{cache_f}.{os.getpid()}"
+    try:
+        _ = os.makedirs(os.path.dirname(cache_f), exist_ok=True)
+        with open(tmp_f, "wb") as fobj:
+            pickle.dump(config, fobj)
+        os.replace(tmp_f, cache_f)
+    except OSError as e:
+        logger.warning(f"config not cached, failed to write {cache_f}: {e!r}")
+        if os.path.exists(tmp_f):
+            os.remove(tmp_f)
+
+    return config
+
+
+def load_config(
+    agent_version,
+    enrich_feat_spec=False,
+    is_training=True,
+    load_model=False,
+):
+    """Load configs.
+
+    Loads the config depending on whether the config is used for training or inference
+
+    Args:
+        agent_version (str):
+            should be same as director
+        enrich_feat_spec (bool):
+            if True then add on the pre-calculated scaling and transform arrays
+        is_training (bool):
+            if True, use lots of resources to train model, else use fewer cpus, etc.
+
+    Returns:
+        obj:
+            class object with all configs required by agent
+
+    """
+    # copy so that changes by the caller do not leak into the cached config
+    config = build_config(agent_version, enrich_feat_spec, is_training).copy(deep=True)
 
     if load_model:
         # TODO fix the hacky import
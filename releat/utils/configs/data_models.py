@@ -5,6 +5,7 @@ All data models for configs
 """
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Any
 
 from pydantic import BaseModel
@@ -350,6 +351,27 @@ class TraderConfig(BaseModel):
     lot: float
 
 
+@dataclass(frozen=True, slots=True)
+class HotConfig:
+    """Hot config.
+
+    Plain copies of the config values that the gym environment reads at every step,
+    because attribute access on pydantic models is slow.
+
+    """
+
+    # aerospike namespace
+    namespace: str
+    # aerospike set name
+    set_name: str
+    # pip of the symbol of the first feature in each feature group (np.array)
+    pip_by_feat_group: Any
+    # transforms of the first feature in each feature group
+    transforms_by_feat_group: tuple
+    # fused transforms of the first feature in each feature group, None if not fused
+    fused_transforms_by_feat_group: tuple
+
+
 class AgentConfig(BaseModel):
     """Agent config.
 
@@ -373,6 +395,10 @@ class AgentConfig(BaseModel):
     # Dict of SymbolSpec
     symbol_info: list[SymbolSpec]
     symbol_info_index: dict
+    # pip of each symbol in symbol_info (np.array)
+    pip_by_symbol: Any
+    # pip of the symbol of the first feature in each feature group (np.array)
+    pip_by_feat_group: Any
     # Shape of the observation / model input data
     observation_space: Any
     # Shape of the action space
@@ -400,3 +426,6 @@ class AgentConfig(BaseModel):
     rl_reporting: dict
     rl_debug: dict
     rl_resources: dict
+
+    # values read at every gym step, see HotConfig
+    hot_config: Any = None
@@ -9,15 +9,18 @@ from __future__ import annotations
 
 import logging
 import os
+import re
 import shlex
 import shutil
 import signal
+import socket
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
 from pathlib import Path
 from time import sleep
+from time import time
 
-import ray
 import requests
 
 from releat.utils.configs.constants import mt5_api_port_map
@@ -61,8 +64,12 @@ def start_process(cmd_str, blocking=True):
 def get_pids(name):
     """Get process ids.
 
-    Gets the process IDs based on the process name. Process name must be an exact match.
-    See running processes by first running 'ps -A' to list all processes.
+    Gets the process IDs based on the process name, matched in the same way as pgrep,
+    i.e. name is a regex pattern searched for in the process name. See running
+    processes by first running 'ps -A' to list all processes.
+
+    Reads the process names from /proc rather than starting a pgrep process, and only
+    falls back to pgrep if /proc is not available.
 
     Args:
         name (str):
@@ -73,10 +80,26 @@ def get_pids(name):
             process ids
 
     """
-    try:
-        return list(map(int, subprocess.check_output(["pgrep", name]).split()))
-    except Exception:
-        return []
+    if not os.path.isdir("/proc"):
+        try:
+            return list(map(int, subprocess.check_output(["pgrep", name]).split()))
+        except Exception:
+            return []
+
+    pattern = re.compile(name)
+    pids = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/comm") as fobj:
+                comm = fobj.read().rstrip("\n")
+        except OSError:
+            # process ended whilst scanning
+            continue
+        if pattern.search(comm):
+            pids.append(int(pid))
+    return sorted(pids)
 
 
 def kill_processes(pids):
@@ -101,15 +124,89 @@ def kill_processes(pids):
                 logger.info(f"process id: {pid} already killed")
 
 
+def wait_until_ready(is_ready, name, timeout_s=60):
+    """Wait until ready.
+
+    Polls until a service is ready so that callers can use it straight away.
+
+    Args:
+        is_ready (function):
+            returns True once the service is ready
+        name (str):
+            name of the service for logging
+        timeout_s (int):
+            seconds to wait before giving up
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError:
+            if the service is not ready within timeout_s
+
+    """
+    t0 = time()
+    while not is_ready():
+        if time() - t0 > timeout_s:
+            raise RuntimeError(f"{name} not ready after {timeout_s}s")
+        sleep(0.5)
+
+
+def is_port_open(host, port, timeout_s=0.1):
+    """Is port open.
+
+    Probes a TCP port directly, which is much faster than starting a client process
+    such as asinfo to check if a service is up.
+
+    Args:
+        host (str):
+            host address, i.e. '127.0.0.1'
+        port (int):
+            port of the service
+        timeout_s (float):
+            seconds to wait for the connection
+
+    Returns:
+        bool:
+            True if the port accepts connections
+
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout_s):
+            return True
+    except OSError:
+        return False
+
+
+def is_aerospike_ready():
+    """Check if Aerospike is ready to accept requests on its service port."""
+    return is_port_open("127.0.0.1", 3000)
+
+
+def is_ray_ready():
+    """Check if the ray head node is ready.
+
+    Ray writes the address of the current cluster's GCS server to
+    /tmp/ray/ray_current_cluster when the head node starts.
+
+    """
+    try:
+        with open("/tmp/ray/ray_current_cluster") as fobj:
+            host, port = fobj.read().strip().rsplit(":", 1)
+    except (OSError, ValueError):
+        return False
+    return is_port_open(host, int(port))
+
+
 def start_aerospike():
     """Start Aerospike."""
-    res = subprocess.run("asinfo -v STATUS", capture_output=True, text=True, shell=True)
-    if "ERROR" in res.stdout != "":
+    if is_aerospike_ready():
+        logger.info("Aerospike already started")
+    else:
         cmd_str = "asd --config-file ./infrastructure/aerospike/aerospike.conf"
         _ = start_process(cmd_str, blocking=False)
+        wait_until_ready(is_aerospike_ready, "Aerospike")
         logger.info("Aerospike started")
-    else:
-        logger.info("Aerospike already started")
 
 
 def stop_aerospike():
@@ -145,11 +242,9 @@ def stop_mt5():
 
 def start_ray():
     """Start ray."""
-    try:
-        ray.init(address="auto")
-        assert ray.is_initialized()
+    if is_ray_ready():
         logger.info("Ray already started")
-    except ConnectionError:
+    else:
         import tensorflow as tf
 
         num_cpus = os.cpu_count()
@@ -160,10 +255,7 @@ def start_ray():
         logger.debug(cmd_str)
         _ = start_process(cmd_str, blocking=False)
 
-        sleep(15)
-        ray.init(address="auto")
-        assert ray.is_initialized(), "Ray failed to initialize"
-
+        wait_until_ready(is_ray_ready, "Ray")
         logger.info("Ray started")
 
 
@@ -209,6 +301,7 @@ def start_redis():
     cmd_str = "redis-server infrastructure/redis/redis.conf"
     logger.debug(cmd_str)
     _ = start_process(cmd_str, blocking=False)
+    wait_until_ready(lambda: len(get_pids("redis-server")) > 0, "redis")
     logger.info("redis started")
 
 
@@ -233,6 +326,7 @@ def start_tensorboard():
         cmd_str += f"{f.split('/')[-1]}:{f}/algo,"
     cmd_str = cmd_str[:-1]
     _ = start_process(cmd_str, blocking=False)
+    wait_until_ready(lambda: len(get_pids("tensorboard")) > 0, "tensorboard")
     logger.info("tensorboard started")
 
 
@@ -250,11 +344,16 @@ def stop_ray():
 
 
 def start_services():
-    """Start all services."""
-    start_aerospike()
-    start_ray()
-    start_tensorboard()
-    start_redis()
+    """Start all services.
+
+    The services do not depend on each other, so they are started concurrently and
+    start up takes as long as the slowest service rather than the sum of all of them.
+
+    """
+    services = [start_aerospike, start_ray, start_tensorboard, start_redis]
+    with ThreadPoolExecutor(len(services)) as executor:
+        # list to re-raise the first start up failure, i.e. a service that is not ready
+        _ = list(executor.map(lambda start_service: start_service(), services))
 
 
 def stop_services():
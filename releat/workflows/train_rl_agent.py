@@ -37,9 +37,11 @@ def train_rl_agent(config, AgentModel):
 
     ModelCatalog.register_custom_model("AgentModel", AgentModel)
 
+    # put the config in the object store once rather than pickling it for every
+    # rollout worker
     env_config = {
         **config.rl_env,
-        "env_config": dict(config),
+        "env_config": {"config_ref": ray.put(dict(config))},
     }
 
     trainer = (
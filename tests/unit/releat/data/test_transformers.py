@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import numpy as np
+
+from releat.data.transformers import apply_fused_transform
+from releat.data.transformers import apply_transform
+from releat.data.transformers import make_fused_transform
+from releat.utils.configs.data_models import SimpleFeatureConfig
+from releat.utils.configs.data_models import TransformerConfig
+
+
+def make_feature_config(transforms, output_shape):
+    return SimpleFeatureConfig(
+        name="differencing",
+        broker="metaquotes",
+        index=0,
+        symbol="EURUSD",
+        timeframe="30s",
+        inputs=["avg_price"],
+        output_shape=output_shape,
+        timeframe_mode="rolling",
+        kwargs={},
+        fillna="forward",
+        transforms=transforms,
+    )
+
+
+def test_fused_transform():
+    # both signs, zero and values outside of the clip limits
+    arr = np.array(
+        [[-40.0, -3.5], [-2.5, -1.0], [-0.5, 0.0], [0.0, 0.5], [1.0, 2.5], [3.5, 40.0]],
+        dtype="float32",
+    )
+    shape = arr.shape
+    # lambda of 0 and 2 on both signs, as well as values in between
+    lam = np.array(
+        [[0.0, 2.0], [0.0, 2.0], [2.0, 0.0], [2.0, 0.0], [0.5, 1.3], [1.9, 0.0]],
+        dtype="float32",
+    )
+    transforms = [
+        TransformerConfig(
+            name="clip",
+            method="percentile",
+            clip_min=np.full(shape, -30.0, dtype="float32"),
+            clip_max=np.full(shape, 30.0, dtype="float32"),
+            scale_factor=1,
+        ),
+        TransformerConfig(
+            name="scale",
+            method="PowerTransformer",
+            lam=lam,
+            mean=np.full(shape, 0.1, dtype="float32"),
+            std=np.full(shape, 0.8, dtype="float32"),
+        ),
+        TransformerConfig(name="scale", method="PiecewiseLinear"),
+        TransformerConfig(
+            name="clip",
+            method="value",
+            clip_min=np.full(shape, -3.0, dtype="float32"),
+            clip_max=np.full(shape, 3.0, dtype="float32"),
+            scale_factor=0.5,
+        ),
+    ]
+    fc = make_feature_config(transforms, shape)
+
+    expected = arr.copy()
+    for tc in fc.transforms:
+        expected = apply_transform(expected, tc)
+
+    fused_transform = make_fused_transform(fc)
+    assert fused_transform is not None
+    out = apply_fused_transform(arr.copy(), *fused_transform)
+    assert out.dtype == np.float32
+    assert np.allclose(out, expected, atol=1e-6)
+
+
+def test_fused_transform_fallback():
+    # clip limits are only set when the transforms are enriched
+    transforms = [TransformerConfig(name="clip", method="value", scale_factor=1)]
+    fc = make_feature_config(transforms, (5, 1))
+    assert make_fused_transform(fc) is None
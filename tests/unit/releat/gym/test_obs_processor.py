@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from releat.data.transformers import apply_transform
+from releat.data.transformers import make_fused_transform
+from releat.gym_env.obs_processor import get_curr_price
+from releat.gym_env.obs_processor import get_curr_price_batch
+from releat.gym_env.obs_processor import get_obs
+from releat.gym_env.obs_processor import init_raw_data
+from releat.gym_env.obs_processor import make_raw_data
+from releat.gym_env.obs_processor import portfolio_to_model_input
+from releat.gym_env.obs_processor import RingBuffer
+from releat.gym_env.obs_processor import update_raw_data
+from releat.utils.configs.data_models import HotConfig
+from releat.utils.configs.data_models import TransformerConfig
+
+
+class StubClient:
+    """Aerospike client serving records from a dict."""
+
+    def __init__(self, records):
+        self.records = records
+
+    def get(self, key):
+        return key, None, dict(self.records[key[2]])
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+
+def test_ring_buffer():
+    data = np.random.rand(30, 3).astype("float32")
+    window = data[:7]
+    ring_buffer = RingBuffer(data[:7].copy())
+    cols_by_field = {"0": slice(0, 1), "1": slice(1, 3)}
+    for i in range(7, 30):
+        window = np.vstack([window, data[i : i + 1]])[1:]
+        ring_buffer.push_fields({"0": data[i, :1], "1": data[i, 1:]}, cols_by_field)
+        # records ordered from oldest to newest
+        ordered = np.concatenate(
+            (ring_buffer.buf[ring_buffer.head :], ring_buffer.buf[: ring_buffer.head]),
+        )
+        assert np.array_equal(ordered, window)
+        assert np.array_equal(ring_buffer.take(np.arange(0, 7, 3)), window[::3])
+        assert np.array_equal(ring_buffer.take(np.arange(7), slice(1, 3)), window[:, 1:])
+
+
+def test_get_curr_price():
+    # min bid, max bid, min ask, max ask for each symbol
+    price = np.array([1.1, 1.1002, 1.1001, 1.1003, 150.0, 150.02, 150.01, 150.03])
+    pip_by_symbol = np.array([1e-4, 1e-2])
+    for _ in range(50):
+        curr_price = get_curr_price(price, pip_by_symbol)
+        assert curr_price.shape == (2, 2)
+        assert np.all(curr_price >= price.reshape(2, 2, 2)[:, :, 0] - 1e-3)
+        assert np.all(curr_price <= price.reshape(2, 2, 2)[:, :, 1] + 1e-3)
+        # each symbol is sampled on a grid of its own pip / 10
+        for pip, prices in zip(pip_by_symbol, curr_price):
+            ticks = prices * 10 / pip
+            assert np.allclose(ticks, np.round(ticks), rtol=0, atol=0.1)
+
+
+def test_get_curr_price_batch():
+    prices = np.array([[1.1, 1.1002, 1.1001, 1.1003], [1.2, 1.2002, 1.2001, 1.2003]])
+    pip_by_symbol = np.array([1e-4])
+    curr_prices = get_curr_price_batch(prices, pip_by_symbol)
+    assert curr_prices.shape == (2, 1, 2)
+    assert np.all(curr_prices >= prices.reshape(2, 1, 2, 2)[..., 0] - 1e-3)
+    assert np.all(curr_prices <= prices.reshape(2, 1, 2, 2)[..., 1] + 1e-3)
+
+
+def test_portfolio_to_model_input():
+    portfolio = np.zeros((4, 13))
+    portfolio[:, 5] = [1, 2, 3, 0]
+    portfolio[:, 6] = [1, -1, 1, 0]
+    portfolio[:, 12] = [12.5, -3.2, 200.0, 0.0]
+    # pos_size x pos_dir / 2 and the two-sided log scaled pos_val of each position
+    pos_val = portfolio[:, 12]
+    scaled = np.sign(pos_val) * np.log1p(np.abs(pos_val)) / 3 + pos_val * 0.03
+    expected = np.stack([portfolio[:, 5] * portfolio[:, 6] / 2, np.clip(scaled, -2, 2)])
+    model_input = portfolio_to_model_input(portfolio)
+    assert model_input.dtype == np.float32
+    assert np.allclose(model_input, expected.T.flatten(), atol=1e-5)
+
+
+def make_records(num, widths):
+    rng = np.random.default_rng(0)
+    records = {}
+    for j in range(num):
+        bins = {}
+        for k, width in widths.items():
+            # column 0 is the price that is differenced, the rest are features
+            feats = rng.standard_normal(width)
+            feats[0] = 1.1 + rng.standard_normal() * 1e-3
+            bins[k] = feats.tolist()
+        bins["date"] = j
+        bins["trade_price"] = [1.1, 1.1002, 1.1001, 1.1003]
+        bins["date_arr"] = [0.1, 0.2, 0.3]
+        records[j] = bins
+    return records
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_get_obs(fused):
+    # feature group 0 is 5 x 1 every 2 records, feature group 1 is 3 x 10 every 6
+    widths = {"0": 1, "1": 10}
+    feat_lens = {"0": 5, "1": 3}
+    obs_interval = {"0": 2, "1": 6}
+    raw_data_shape = {k: feat_lens[k] * obs_interval[k] + 1 for k in widths}
+    raw_data_shape["max"] = max(raw_data_shape.values())
+    feat_group_cols = {"0": slice(0, 1), "1": slice(1, 11)}
+    obs_idx = tuple(
+        np.arange(
+            raw_data_shape["max"] - raw_data_shape[k],
+            raw_data_shape["max"],
+            obs_interval[k],
+            dtype=np.intp,
+        )
+        for k in widths
+    )
+
+    pip = 1e-4
+    transforms_by_feat_group = (
+        [
+            TransformerConfig(
+                name="clip",
+                method="value",
+                clip_min=np.full((5, 1), -30.0, dtype="float32"),
+                clip_max=np.full((5, 1), 30.0, dtype="float32"),
+                scale_factor=0.5,
+            ),
+        ],
+        [TransformerConfig(name="scale", method="PiecewiseLinear")],
+    )
+    fused_transforms_by_feat_group = tuple(
+        (
+            make_fused_transform(
+                SimpleNamespace(transforms=transforms, output_shape=(feat_lens[k], 1)),
+            )
+            if fused
+            else None
+        )
+        for k, transforms in zip(widths, transforms_by_feat_group)
+    )
+    hot_config = HotConfig(
+        namespace="test",
+        set_name="test",
+        pip_by_feat_group=np.array([pip, pip], dtype=np.float32),
+        transforms_by_feat_group=transforms_by_feat_group,
+        fused_transforms_by_feat_group=fused_transforms_by_feat_group,
+    )
+
+    records = make_records(100, widths)
+    client = StubClient(records)
+
+    def get_expected_obs(old_raw_data):
+        # a strided view of each feature group and then differenced
+        obs = {}
+        for k, transforms in zip(widths, transforms_by_feat_group):
+            feat_group_obs = old_raw_data[k][:: obs_interval[k]].copy()
+            feats = feat_group_obs[:, 0]
+            feats = feats - feats[-1]
+            feats = feats[:-1] / pip
+            feats = feats.reshape((-1, 1))
+            for tc in transforms:
+                feats = apply_transform(feats, tc)
+            feat_group_obs = feat_group_obs[1:]
+            feat_group_obs[:, 0] = feats[:, 0]
+            obs[k] = feat_group_obs.astype("float32")
+        return obs
+
+    def assert_obs_equal(obs, expected_obs):
+        for k in widths:
+            assert obs[k].shape == (feat_lens[k], widths[k])
+            if fused:
+                assert np.allclose(obs[k], expected_obs[k], atol=1e-6)
+            else:
+                assert np.array_equal(obs[k], expected_obs[k])
+
+    i = 30
+    raw_data = make_raw_data(feat_group_cols, raw_data_shape)
+    # dirty the buffer to check that reset overwrites every record
+    raw_data["buf"].buf[:] = 1.0
+    raw_data["buf"].head = 3
+    raw_data = init_raw_data(client, hot_config, feat_group_cols, raw_data, i)
+    old_raw_data = {
+        k: np.array(
+            [records[j][k] for j in range(i - raw_data_shape[k] + 1, i + 1)],
+            dtype=np.float32,
+        )
+        for k in widths
+    }
+    obs = get_obs(hot_config, obs_idx, feat_group_cols, raw_data)
+    assert_obs_equal(obs, get_expected_obs(old_raw_data))
+
+    for n in [1, 2, 3, 1, 3, 2, 3]:
+        raw_data = update_raw_data(
+            client,
+            hot_config,
+            feat_group_cols,
+            raw_data,
+            i + 1,
+            n,
+        )
+        for j in range(i + 1, i + n + 1):
+            for k in widths:
+                row = np.array([records[j][k]], dtype=np.float32)
+                old_raw_data[k] = np.vstack([old_raw_data[k], row])[1:]
+        i += n
+
+        assert raw_data["trade_prices"].shape == (n, 4)
+        assert raw_data["dates"] == list(range(i - n + 1, i + 1))
+        assert raw_data["date"] == i
+        obs = get_obs(hot_config, obs_idx, feat_group_cols, raw_data)
+        assert_obs_equal(obs, get_expected_obs(old_raw_data))